@@ -1,31 +1,35 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
-import io
 import json
-from typing import List
+from typing import List, Optional, Union
 
-CONTENT_LENGTH: str = "Content-Length:"
+# Header names are case-insensitive, so only the start of each header line is lowercased
+# and compared against this.
+CONTENT_LENGTH: bytes = b"content-length:"
 
 
-def process_rpc_json(data: str) -> List[str]:
-    """Process the JSON data which comes from the server."""
-    str_stream: io.StringIO = io.StringIO(data)
+def process_rpc_json(data: Union[bytes, bytearray]) -> Optional[List[str]]:
+    """Process the JSON data which comes from the server.
 
-    length: int = 0
+    Returns None if the message has not been fully received yet.
+    """
+    length: Optional[int] = None
+    start: int = 0
 
     while True:
-        line: str = str_stream.readline()
-        if CONTENT_LENGTH.lower() in line.lower():
-            length = int(line[len(CONTENT_LENGTH) :])
-            break
-
-        if not line or line.isspace():
-            raise ValueError("Header does not contain Content-Length")
-
-    while True:
-        line: str = str_stream.readline()
+        end: int = data.find(b"\n", start)
+        if end == -1:
+            return None
+        line: Union[bytes, bytearray] = data[start:end]
+        start = end + 1
         if not line or line.isspace():
             break
+        if line[: len(CONTENT_LENGTH)].lower() == CONTENT_LENGTH:
+            length = int(line[len(CONTENT_LENGTH) :])
+
+    if length is None:
+        raise ValueError("Header does not contain Content-Length")
+    if len(data) < start + length:
+        return None
 
-    raw_json: str = str_stream.read(length)
-    return json.loads(raw_json)
+    return json.loads(data[start : start + length])
@@ -4,6 +4,8 @@
 import socket
 import sys
 
+RPC_HEADER_TEMPLATE = b"Content-Length: %d\nContent-Type: application/json\nRequest-uuid: %s\n\n"
+
 
 class SocketManager(object):
     """Create a socket and connect to the given address.
@@ -39,6 +41,34 @@ class SocketManager(object):
 
         return self
 
+    def send(self, *buffers):
+        """Send all of the given buffers, in order.
+
+        Where the platform supports it the buffers are written with a single
+        scatter-gather `sendmsg` call instead of being concatenated first.
+        """
+        sock = self.socket
+        if sock is None:
+            raise ConnectionError("Socket is not connected")
+
+        if not hasattr(sock, "sendmsg"):
+            sock.sendall(b"".join(buffers))
+            return
+
+        views = [memoryview(buffer) for buffer in buffers]
+        while views:
+            sent = sock.sendmsg(views)
+            # Drop whatever was written and retry with the remainder.
+            while views and sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            if sent:
+                views[0] = views[0][sent:]
+
+    def send_rpc(self, data, uuid):
+        """Send the JSON-encoded `data` bytes as a JSON-RPC message for the given request uuid."""
+        header = RPC_HEADER_TEMPLATE % (len(data), str(uuid).encode("utf-8"))
+        self.send(header, data)
+
     def close(self):
         if self.socket:
             try:
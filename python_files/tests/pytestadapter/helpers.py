@@ -1,26 +1,35 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import asyncio
+import collections
 import contextlib
-import io
-import json
+import functools
+import logging
+import mmap
 import os
 import pathlib
 import socket
-import subprocess
 import sys
-import threading
 import uuid
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, TypedDict
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore (orjson is optional)
+
+
+log = logging.getLogger(__name__)
 
 TEST_DATA_PATH = pathlib.Path(__file__).parent / ".data"
+PYTHON_FILES_PATH: str = os.fspath(pathlib.Path(__file__).parent.parent.parent)
 
 
 def get_absolute_test_id(test_id: str, testPath: pathlib.Path) -> str:
-    split_id = test_id.split("::")[1:]
-    absolute_test_id = "::".join([str(testPath), *split_id])
-    print("absolute path", absolute_test_id)
+    _, separator, test_name = test_id.partition("::")
+    absolute_test_id = f"{testPath}{separator}{test_name}"
+    log.debug("absolute path %s", absolute_test_id)
     return absolute_test_id
 
 
@@ -45,9 +54,12 @@ def create_server(
     host: str = "127.0.0.1",
     port: int = 0,
     backlog: int = socket.SOMAXCONN,
-    timeout: int = 1000,
 ) -> socket.socket:
-    """Return a local server socket listening on the given port."""
+    """Return a local, non-blocking server socket listening on the given port.
+
+    Connections are accepted and read through an event loop, which waits for readiness instead
+    of polling with a timeout.
+    """
     server: socket.socket = _new_sock()
     if port:
         # If binding to a specific port, make sure that the user doesn't have
@@ -61,8 +73,7 @@ def create_server(
             except (AttributeError, OSError):
                 pass  # Not available everywhere
     server.bind((host, port))
-    if timeout:
-        server.settimeout(timeout)
+    server.setblocking(False)
     server.listen(backlog)
     return server
 
@@ -85,51 +96,44 @@ def _new_sock() -> socket.socket:
     return sock
 
 
-CONTENT_LENGTH: str = "Content-Length:"
+CONTENT_LENGTH: bytes = b"content-length:"
 Env_Dict = TypedDict("Env_Dict", {"TEST_UUID": str, "TEST_PORT": str, "PYTHONPATH": str})
 
 
-def process_rpc_message(data: str) -> Tuple[Dict[str, Any], str]:
-    """Process the JSON data which comes from the server which runs the pytest discovery."""
-    str_stream: io.StringIO = io.StringIO(data)
-
-    length: int = 0
-
-    while True:
-        line: str = str_stream.readline()
-        if CONTENT_LENGTH.lower() in line.lower():
-            length = int(line[len(CONTENT_LENGTH) :])
-            break
-
-        if not line or line.isspace():
-            raise ValueError("Header does not contain Content-Length")
+def process_rpc_message(data: bytearray) -> Optional[Dict[str, Any]]:
+    """Remove the first JSON-RPC message from the buffer and return its JSON data.
 
+    Returns None and leaves the buffer untouched if the message has not been fully received yet.
+    """
+    length: Optional[int] = None
+    start: int = 0
     while True:
-        line: str = str_stream.readline()
+        end: int = data.find(b"\n", start)
+        if end == -1:
+            return None
+        line: bytearray = data[start:end]
+        start = end + 1
         if not line or line.isspace():
             break
+        if line[: len(CONTENT_LENGTH)].lower() == CONTENT_LENGTH:
+            length = int(line[len(CONTENT_LENGTH) :])
 
-    raw_json: str = str_stream.read(length)
-    return json.loads(raw_json), str_stream.read()
-
-
-def process_rpc_json(data: str) -> List[Dict[str, Any]]:
-    """Process the JSON data which comes from the server which runs the pytest discovery."""
-    json_messages = []
-    remaining = data
-    while remaining:
-        json_data, remaining = process_rpc_message(remaining)
-        json_messages.append(json_data)
+    if length is None:
+        raise ValueError("Header does not contain Content-Length")
+    if len(data) - start < length:
+        return None
 
-    return json_messages
+    json_data: Dict[str, Any] = json_loads(data[start : start + length])
+    del data[: start + length]
+    return json_data
 
 
-def runner(args: List[str]) -> Optional[List[Dict[str, Any]]]:
+def runner(args: List[str]) -> List[Dict[str, Any]]:
     """Run the pytest discovery and return the JSON data from the server."""
     return runner_with_cwd(args, TEST_DATA_PATH)
 
 
-def runner_with_cwd(args: List[str], path: pathlib.Path) -> Optional[List[Dict[str, Any]]]:
+def runner_with_cwd(args: List[str], path: pathlib.Path) -> List[Dict[str, Any]]:
     """Run the pytest discovery and return the JSON data from the server."""
     process_args: List[str] = [
         sys.executable,
@@ -141,62 +145,126 @@ def runner_with_cwd(args: List[str], path: pathlib.Path) -> Optional[List[Dict[s
     ] + args
     listener: socket.socket = create_server()
     _, port = listener.getsockname()
-    listener.listen()
 
     env = os.environ.copy()
     env.update(
         {
             "TEST_UUID": str(uuid.uuid4()),
             "TEST_PORT": str(port),
-            "PYTHONPATH": os.fspath(pathlib.Path(__file__).parent.parent.parent),
+            "PYTHONPATH": PYTHON_FILES_PATH,
         }
     )
-    completed = threading.Event()
-
-    result = []
-    t1: threading.Thread = threading.Thread(
-        target=_listen_on_socket, args=(listener, result, completed)
-    )
-    t1.start()
 
-    t2 = threading.Thread(
-        target=_run_test_code,
-        args=(process_args, env, path, completed),
-    )
-    t2.start()
-
-    t1.join()
-    t2.join()
+    try:
+        return asyncio.run(_run_test_code(process_args, env, path, listener))
+    finally:
+        listener.close()
 
-    return process_rpc_json(result[0]) if result else None
 
+async def _run_test_code(
+    proc_args: List[str], proc_env, proc_cwd: pathlib.Path, listener: socket.socket
+) -> List[Dict[str, Any]]:
+    """Run the test code in a subprocess and collect the JSON data it sends over the socket.
 
-def _listen_on_socket(listener: socket.socket, result: List[str], completed: threading.Event):
-    """Listen on the socket for the JSON data from the server.
-    Created as a separate function for clarity in threading.
+    Every connection made to the listener is read on the same event loop as the subprocess.
     """
-    sock, (other_host, other_port) = listener.accept()
-    listener.settimeout(1)
-    all_data: list = []
-    while True:
-        data: bytes = sock.recv(1024 * 1024)
-        if not data:
-            if completed.is_set():
-                break
-            else:
-                try:
-                    sock, (other_host, other_port) = listener.accept()
-                except socket.timeout:
-                    result.append("".join(all_data))
+    loop = asyncio.get_running_loop()
+    result: Deque[Dict[str, Any]] = collections.deque()
+    connections: List[asyncio.Task] = []
+
+    # Once the subprocess exits, this socket connects to the listener to tell the accept loop
+    # to stop. The listener queues connections in order, so every connection the subprocess
+    # made is accepted before this one, and no accept is ever cancelled halfway through.
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as stop_sock:
+        stop_sock.setblocking(False)
+        stop_sock.bind(listener.getsockname()[:1] + (0,))
+        stop_address = stop_sock.getsockname()
+
+        async def accept_connections():
+            while True:
+                sock, address = await loop.sock_accept(listener)
+                if address == stop_address:
+                    sock.close()
                     return
-        all_data.append(data.decode("utf-8"))
-    result.append("".join(all_data))
-
+                connections.append(loop.create_task(_listen_on_socket(sock, result)))
 
-def _run_test_code(proc_args: List[str], proc_env, proc_cwd: str, completed: threading.Event):
-    result = subprocess.run(proc_args, env=proc_env, cwd=proc_cwd)
-    completed.set()
-    return result
+        acceptor = loop.create_task(accept_connections())
+        try:
+            # Python creates file descriptors as non-inheritable, so there is nothing for
+            # close_fds to do but walk the descriptor table before exec.
+            process = await asyncio.create_subprocess_exec(
+                *proc_args,
+                env=proc_env,
+                cwd=proc_cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                close_fds=False,
+            )
+            await process.wait()
+        except BaseException:
+            # The stop connection will never be made, so the accept loop has to be cancelled.
+            acceptor.cancel()
+            raise
+
+        await loop.sock_connect(stop_sock, listener.getsockname())
+        await acceptor
+
+    await asyncio.gather(*connections)
+    return list(result)
+
+
+async def _listen_on_socket(sock: socket.socket, result: Deque[Dict[str, Any]]):
+    """Collect the JSON data from the server on the given connection until it is closed."""
+    async for json_data in _receive_rpc_messages(sock):
+        result.append(json_data)
+
+
+async def _receive_rpc_messages(sock: socket.socket) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the JSON data of each message received on the connection as soon as it is complete."""
+    loop = asyncio.get_running_loop()
+    sock.setblocking(False)
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    data = bytearray()
+    with sock:
+        while True:
+            size: int = await loop.sock_recv_into(sock, view)
+            if not size:
+                return
+            data += view[:size]
+            json_data = process_rpc_message(data)
+            while json_data is not None:
+                yield json_data
+                json_data = process_rpc_message(data)
+
+
+TEST_MARKER: bytes = b"test_marker--"
+
+
+@functools.lru_cache(maxsize=None)
+def _find_test_markers(test_file_path: str) -> Dict[str, int]:
+    """Map the test name of every "test_marker--[test_name]" string in the file to its line number.
+
+    The file is scanned once and the result is cached, as it is looked up once per test in the file.
+    """
+    markers: Dict[str, int] = {}
+    if os.path.getsize(test_file_path) == 0:
+        # An empty file cannot be mapped, and has no markers anyway.
+        return markers
+    with open(test_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        line_number: int = 1
+        counted: int = 0
+        position: int = mm.find(TEST_MARKER)
+        while position != -1:
+            line_number += mm[counted:position].count(b"\n")
+            counted = position
+            end: int = mm.find(b"\n", position)
+            if end == -1:
+                end = len(mm)
+            name: List[bytes] = mm[position + len(TEST_MARKER) : end].split(None, 1)
+            if name:
+                markers.setdefault(name[0].split(b"[")[0].decode("utf-8"), line_number)
+            position = mm.find(TEST_MARKER, end)
+    return markers
 
 
 def find_test_line_number(test_name: str, test_file_path) -> str:
@@ -208,10 +276,10 @@ def find_test_line_number(test_name: str, test_file_path) -> str:
     test_name: The name of the test to find the line number for, will be unique per file.
     test_file_path: The path to the test file where the test is located.
     """
-    test_file_unique_id: str = "test_marker--" + test_name.split("[")[0]
-    with open(test_file_path) as f:
-        for i, line in enumerate(f):
-            if test_file_unique_id in line:
-                return str(i + 1)
+    line_number: Optional[int] = _find_test_markers(os.fspath(test_file_path)).get(
+        test_name.split("[")[0]
+    )
+    if line_number is not None:
+        return str(line_number)
     error_str: str = f"Test {test_name!r} not found on any line in {test_file_path}"
     raise ValueError(error_str)
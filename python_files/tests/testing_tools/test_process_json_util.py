@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+
+from testing_tools.process_json_util import process_rpc_json
+
+
+def create_message(test_ids) -> bytes:
+    data = json.dumps(test_ids, ensure_ascii=False).encode("utf-8")
+    return b"Content-Length: %d\r\nContent-Type: application/json\r\n\r\n" % len(data) + data
+
+
+def test_complete_message():
+    assert process_rpc_json(create_message(["a.py::test_a", "b.py::test_b"])) == [
+        "a.py::test_a",
+        "b.py::test_b",
+    ]
+
+
+def test_bare_newline_headers():
+    assert process_rpc_json(b'content-length: 5\nContent-Type: application/json\n\n["a"]') == ["a"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"Content-Len",
+        b"Content-Length: 5\r\n",
+        b"Content-Length: 5\r\nContent-Type: application/json\r\n",
+    ],
+)
+def test_partial_header(data):
+    assert process_rpc_json(data) is None
+
+
+def test_partial_body():
+    message = create_message(["a.py::test_a"])
+    header_end = message.index(b"\r\n\r\n") + 4
+    for end in range(header_end, len(message)):
+        assert process_rpc_json(message[:end]) is None
+
+
+def test_non_ascii_body():
+    test_ids = ["tests/test_é.py::test_日本語"]
+    message = create_message(test_ids)
+    assert process_rpc_json(message) == test_ids
+    # Cutting the body inside a multi-byte character is still just an incomplete message.
+    assert process_rpc_json(message[: message.index("é".encode("utf-8")) + 1]) is None
+
+
+def test_lone_surrogate():
+    # JSON.stringify escapes lone surrogates from ids built from non-UTF-8 file names.
+    data = b'["test_\\udcff.py::test_a", "test_x.py::test_b"]'
+    message = b"Content-Length: %d\r\n\r\n" % len(data) + data
+    assert process_rpc_json(message) == ["test_\udcff.py::test_a", "test_x.py::test_b"]
+
+
+def test_missing_content_length():
+    with pytest.raises(ValueError):
+        process_rpc_json(b'Content-Type: application/json\r\n\r\n["a"]')
@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import pytest
+
+from testing_tools.socket_manager import SocketManager
+
+
+class FakeSocket:
+    """A socket whose sendmsg writes at most `limit` bytes per call."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.written = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        data = b"".join(bytes(buffer) for buffer in buffers)[: self.limit]
+        self.written += data
+        return len(data)
+
+
+class FakeSocketWithoutSendmsg:
+    """A socket without sendmsg, as on Windows."""
+
+    def __init__(self):
+        self.written = bytearray()
+
+    def sendall(self, data):
+        self.written += data
+
+
+def create_manager(sock) -> SocketManager:
+    manager = SocketManager(("localhost", 0))
+    manager.socket = sock
+    return manager
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 7, 100])
+def test_send_retries_partial_writes(limit):
+    sock = FakeSocket(limit)
+    create_manager(sock).send(b"abc", b"", b"defg", b"h")
+
+    assert sock.written == b"abcdefgh"
+
+
+def test_send_single_call_when_everything_is_written():
+    sock = FakeSocket(100)
+    create_manager(sock).send(b"abc", b"def")
+
+    assert sock.written == b"abcdef"
+    assert sock.calls == 1
+
+
+def test_send_without_sendmsg():
+    sock = FakeSocketWithoutSendmsg()
+    create_manager(sock).send(b"abc", b"def")
+
+    assert sock.written == b"abcdef"
+
+
+def test_send_when_not_connected():
+    with pytest.raises(ConnectionError):
+        SocketManager(("localhost", 0)).send(b"abc")
+
+
+def test_send_rpc():
+    sock = FakeSocket(100)
+    create_manager(sock).send_rpc(b'{"a": 1}', "fake-uuid")
+
+    assert (
+        sock.written
+        == b'Content-Length: 8\nContent-Type: application/json\nRequest-uuid: fake-uuid\n\n{"a": 1}'
+    )
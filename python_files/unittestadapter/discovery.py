@@ -117,19 +117,14 @@ def discover_tests(
 def post_response(payload: Union[PayloadDict, EOTPayloadDict], port: int, uuid: str) -> None:
     # Build the request data (it has to be a POST request or the Node side will not process it), and send it.
     addr = ("localhost", port)
-    data = json.dumps(payload)
-    request = f"""Content-Length: {len(data)}
-Content-Type: application/json
-Request-uuid: {uuid}
-
-{data}"""
+    data = json.dumps(payload).encode("utf-8")
     try:
         with socket_manager.SocketManager(addr) as s:
             if s.socket is not None:
-                s.socket.sendall(request.encode("utf-8"))
+                s.send_rpc(data, uuid)
     except Exception as e:
         print(f"Error sending response: {e}")
-        print(f"Request data: {request}")
+        print(f"Request data: {data.decode('utf-8')}")
 
 
 if __name__ == "__main__":
@@ -258,18 +258,13 @@ def post_response(payload: Union[PayloadDict, EOTPayloadDict], port: int, uuid:
         except Exception as error:
             print(f"Plugin error connection error[vscode-pytest]: {error}")
             __socket = None
-    data = json.dumps(payload)
-    request = f"""Content-Length: {len(data)}
-Content-Type: application/json
-Request-uuid: {uuid}
-
-{data}"""
+    data = json.dumps(payload).encode("utf-8")
     try:
         if __socket is not None and __socket.socket is not None:
-            __socket.socket.sendall(request.encode("utf-8"))
+            __socket.send_rpc(data, uuid)
     except Exception as ex:
         print(f"Error sending response: {ex}")
-        print(f"Request data: {request}")
+        print(f"Request data: {data.decode('utf-8')}")
 
 
 if __name__ == "__main__":
@@ -295,7 +290,7 @@ if __name__ == "__main__":
     try:
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.connect(("localhost", run_test_ids_port_int))
-        buffer = b""
+        buffer = bytearray()
 
         while True:
             # Receive the data from the client
@@ -304,17 +299,22 @@ if __name__ == "__main__":
                 break
 
             # Append the received data to the buffer
-            buffer += data
+            buffer.extend(data)
 
             try:
                 # Try to parse the buffer as JSON
-                test_ids_from_buffer = process_json_util.process_rpc_json(buffer.decode("utf-8"))
+                test_ids_from_buffer = process_json_util.process_rpc_json(buffer)
+                if test_ids_from_buffer is None:
+                    # The complete JSON object is not yet received
+                    continue
                 # Clear the buffer as complete JSON object is received
-                buffer = b""
+                buffer.clear()
+                break
+            except ValueError as e:
+                # The complete message was received but is malformed, so waiting for more
+                # data will not help.
+                print(f"Error[vscode-unittest]: Could not parse test ids from runTestIdsPort: {e}")
                 break
-            except json.JSONDecodeError:
-                # JSON decoding error, the complete JSON object is not yet received
-                continue
     except socket.error as e:
         print(f"Error: Could not connect to runTestIdsPort: {e}")
         print("Error: Could not connect to runTestIdsPort")
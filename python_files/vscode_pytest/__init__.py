@@ -155,8 +155,8 @@ def get_absolute_test_id(test_id: str, testPath: pathlib.Path) -> str:
     test_id -- the pytest id of the test which is relative to the rootdir.
     testPath -- the path to the file the test is located in, as a pathlib.Path object.
     """
-    split_id = test_id.split("::")[1:]
-    absolute_test_id = "::".join([str(testPath), *split_id])
+    _, separator, test_name = test_id.partition("::")
+    absolute_test_id = f"{testPath}{separator}{test_name}"
     return absolute_test_id
 
 
@@ -788,23 +788,18 @@ def send_post_request(
             __socket = None
             raise VSCodePytestError(error_msg)
 
-    data = json.dumps(payload, cls=cls_encoder)
-    request = f"""Content-Length: {len(data)}
-Content-Type: application/json
-Request-uuid: {TEST_UUID}
-
-{data}"""
+    data = json.dumps(payload, cls=cls_encoder).encode("utf-8")
 
     try:
         if __socket is not None and __socket.socket is not None:
-            __socket.socket.sendall(request.encode("utf-8"))
+            __socket.send_rpc(data, TEST_UUID)
         else:
             print(
-                f"Plugin error connection error[vscode-pytest], socket is None \n[vscode-pytest] data: \n{request} \n",
+                f"Plugin error connection error[vscode-pytest], socket is None \n[vscode-pytest] data: \n{data.decode('utf-8')} \n",
                 file=sys.stderr,
             )
     except Exception as error:
         print(
-            f"Plugin error, exception thrown while attempting to send data[vscode-pytest]: {error} \n[vscode-pytest] data: \n{request}\n",
+            f"Plugin error, exception thrown while attempting to send data[vscode-pytest]: {error} \n[vscode-pytest] data: \n{data.decode('utf-8')}\n",
             file=sys.stderr,
         )
@@ -18,9 +18,6 @@ from testing_tools import process_json_util  # noqa: E402
 # args through sys.argv. It then runs pytest.main() with the args and test_ids.
 
 if __name__ == "__main__":
-    # Add the root directory to the path so that we can import the plugin.
-    directory_path = pathlib.Path(__file__).parent.parent
-    sys.path.append(os.fspath(directory_path))
     sys.path.insert(0, os.getcwd())
     # Get the rest of the args to run with pytest.
     args = sys.argv[1:]
@@ -33,7 +30,7 @@ if __name__ == "__main__":
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.connect(("localhost", run_test_ids_port_int))
         print(f"CLIENT: Server listening on port {run_test_ids_port_int}...")
-        buffer = b""
+        buffer = bytearray()
 
         while True:
             # Receive the data from the client
@@ -42,20 +39,23 @@ if __name__ == "__main__":
                 break
 
             # Append the received data to the buffer
-            buffer += data
+            buffer.extend(data)
 
             try:
                 # Try to parse the buffer as JSON
-                test_ids_from_buffer = process_json_util.process_rpc_json(buffer.decode("utf-8"))
+                test_ids_from_buffer = process_json_util.process_rpc_json(buffer)
+                if test_ids_from_buffer is None:
+                    # The complete JSON object is not yet received
+                    continue
                 # Clear the buffer as complete JSON object is received
-                buffer = b""
+                buffer.clear()
                 print("Received JSON data in run script")
                 break
-            except json.JSONDecodeError:
-                # JSON decoding error, the complete JSON object is not yet received
-                continue
-            except UnicodeDecodeError:
-                continue
+            except ValueError as e:
+                # The complete message was received but is malformed, so waiting for more
+                # data will not help.
+                print(f"Error[vscode-pytest]: Could not parse test ids from runTestIdsPort: {e}")
+                break
     except socket.error as e:
         print(f"Error: Could not connect to runTestIdsPort: {e}")
         print("Error: Could not connect to runTestIdsPort")